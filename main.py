@@ -1,13 +1,160 @@
+import json
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json still works
+    orjson = None
+try:
+    import ijson
+except ImportError:  # optional: stream-parse only the enabled paths
+    ijson = None
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import settings
 import sys
-from typing import Any, Dict, List, Optional, Tuple, Union
+import time
+import types
+from typing import Any, Callable, Dict, Final, List, Mapping, Optional, Tuple, Union
+from urllib.parse import urlparse
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QLabel, QVBoxLayout, QWidget, QPushButton
 )
-from PyQt6.QtCore import QTimer, QThread, pyqtSignal, QObject
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QObject
 from PyQt6.QtGui import QFont
 
+logger = logging.getLogger(__name__)
+
+# Minimum age (seconds) before a cached poll result is considered stale;
+# coalesces rapid manual refreshes onto the last parsed payload
+MIN_TTL = 5.0
+
+# Polling interval bounds (ms); the worker widens the interval on slow
+# links but never past the server's session timeout
+BASE_INTERVAL = 15000
+MAX_INTERVAL = 60000
+
+# Map config sections/keys to JSON paths; frozen and shared by all workers
+_RESPONSE_MAP: Final[Mapping[str, Mapping[str, Tuple[str, ...]]]] = types.MappingProxyType({
+    'status': {
+        'status': ('ocs', 'meta', 'status'),
+        'message': ('ocs', 'meta', 'message'),
+        'status_code': ('ocs', 'meta', 'statuscode')
+    },
+    'nextcloud_info': {
+        'version': ('ocs', 'data', 'nextcloud', 'system', 'version'),
+        'free_space': ('ocs', 'data', 'nextcloud', 'system', 'freespace'),
+        'users': ('ocs', 'data', 'activeUsers', 'last5minutes')
+    },
+    'system_info': {
+        'cpu_load': ('ocs', 'data', 'nextcloud', 'system', 'cpuload'),
+        'total_memory': ('ocs', 'data', 'nextcloud', 'system', 'mem_total'),
+        'free_memory': ('ocs', 'data', 'nextcloud', 'system', 'mem_free'),
+        'total_swap': ('ocs', 'data', 'nextcloud', 'system', 'swap_total'),
+        'free_swap': ('ocs', 'data', 'nextcloud', 'system', 'swap_free')
+    },
+    'database': {
+        'type': ('ocs', 'data', 'server', 'database', 'type'),
+        'version': ('ocs', 'data', 'server', 'database', 'version'),
+        'size': ('ocs', 'data', 'server', 'database', 'size')
+    },
+    'php': {
+        'webserver': ('ocs', 'data', 'server', 'webserver'),
+        'version': ('ocs', 'data', 'server', 'php', 'version'),
+        'opcache': ('ocs', 'data', 'server', 'php', 'opcache'),
+        'extensions': ('ocs', 'data', 'server', 'php', 'extensions')
+    }
+})
+
+
+def _compile_getter(path: Tuple[str, ...]) -> Callable[[dict], Any]:
+    """Compile a key path into a single subscript chain.
+
+    Safe to eval: paths are static constants from the response map. The
+    compiled lambda traverses the whole path in one call instead of one
+    interpreted subscript per step.
+    """
+    return eval("lambda data: data" + "".join(f"[{step!r}]" for step in path))
+
+
+# Flatten the enabled (section, key) paths once at import time so every
+# worker shares one precompiled plan instead of rebuilding it per instance
+_PLAN: Final[List[Tuple[str, str, Callable[[dict], Any]]]] = [
+    (section, key, _compile_getter(_RESPONSE_MAP[section][key]))
+    for section, keys in settings.enabled_settings.items()
+    for key in keys
+]
+# Static result shape shared by every poll; each result is a shallow
+# copy of this (values are scalars), so the per-poll dicts are built in
+# one pass and stay small enough for CPython's free lists
+_RESULT_TEMPLATE: Final[Dict[str, Dict[str, Any]]] = {
+    section: dict.fromkeys(keys)
+    for section, keys in settings.enabled_settings.items()
+}
+
+# ijson prefixes ("ocs.data.server.webserver") for each enabled key, so
+# stream parsing can discard the ~95% of the payload nothing displays
+_WANTED_PREFIXES: Final[Dict[str, Tuple[str, str]]] = {
+    ".".join(_RESPONSE_MAP[section][key]): (section, key)
+    for section, keys in settings.enabled_settings.items()
+    for key in keys
+}
+
+
+# One keep-alive session per host, shared by every worker polling it so
+# multiple instances on the same host reuse one connection pool
+_SESSIONS: Dict[str, requests.Session] = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def _get_session(netloc: str) -> requests.Session:
+    """Return the shared keep-alive session for a host, creating it lazily.
+
+    Auth is passed per-request by the callers since it can differ between
+    instances on the same host.
+    """
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(netloc)
+        if session is None:
+            session = requests.Session()
+            session.headers.update({"OCS-APIRequest": "true"})
+            adapter = HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=8,
+                max_retries=Retry(total=2, backoff_factor=0.3)
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _SESSIONS[netloc] = session
+        return session
+
+
+def _close_sessions() -> None:
+    """Close every shared session; called on app shutdown"""
+    with _SESSIONS_LOCK:
+        for session in _SESSIONS.values():
+            session.close()
+        _SESSIONS.clear()
+
+
+def _data_signature(status: dict) -> int:
+    """Hash a parsed payload so identical refreshes can skip re-rendering"""
+    if orjson is not None:
+        # default=str keeps non-JSON-native values (e.g. Decimal) hashable
+        # instead of raising TypeError inside a Qt slot
+        return hash(orjson.dumps(status, option=orjson.OPT_SORT_KEYS, default=str))
+    return hash(json.dumps(status, sort_keys=True, default=str))
+
+
+def _parse_json(content: bytes) -> Any:
+    """Decode a JSON body with orjson when available, stdlib json otherwise"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
 
 class MonitorWorker(QObject):
     """
@@ -16,6 +163,9 @@ class MonitorWorker(QObject):
     data_ready = pyqtSignal(dict)
     error_occurred = pyqtSignal(str)
     update_started = pyqtSignal()  # New signal to indicate update started
+    stream_connected = pyqtSignal()  # SSE channel is live, polling can stop
+    stream_closed = pyqtSignal()  # SSE channel dropped, fall back to polling
+    interval_hint = pyqtSignal(int)  # suggested poll interval (ms) from observed RTT
 
     def __init__(self, instance, user, passw):
         super().__init__()
@@ -23,54 +173,113 @@ class MonitorWorker(QObject):
         self.user = user
         self.passw = passw
         self.running = True
-        
-        # Map config sections/keys to JSON paths
-        self.response_map: Dict[str, Dict[str, Tuple[str, ...]]] = {
-            'status': {
-                'status': ('ocs', 'meta', 'status'),
-                'message': ('ocs', 'meta', 'message'),
-                'status_code': ('ocs', 'meta', 'statuscode')
-            },
-            'nextcloud_info': {
-                'version': ('ocs', 'data', 'nextcloud', 'system', 'version'),
-                'free_space': ('ocs', 'data', 'nextcloud', 'system', 'freespace'),
-                'users': ('ocs', 'data', 'activeUsers', 'last5minutes')
-            },
-            'system_info': {
-                'cpu_load': ('ocs', 'data', 'nextcloud', 'system', 'cpuload'),
-                'total_memory': ('ocs', 'data', 'nextcloud', 'system', 'mem_total'),
-                'free_memory': ('ocs', 'data', 'nextcloud', 'system', 'mem_free'),
-                'total_swap': ('ocs', 'data', 'nextcloud', 'system', 'swap_total'),
-                'free_swap': ('ocs', 'data', 'nextcloud', 'system', 'swap_free')
-            },
-            'database': {
-                'type': ('ocs', 'data', 'server', 'database', 'type'),
-                'version': ('ocs', 'data', 'server', 'database', 'version'),
-                'size': ('ocs', 'data', 'server', 'database', 'size')
-            },
-            'php': {
-                'webserver': ('ocs', 'data', 'server', 'webserver'),
-                'version': ('ocs', 'data', 'server', 'php', 'version'),
-                'opcache': ('ocs', 'data', 'server', 'php', 'opcache'),
-                'extensions': ('ocs', 'data', 'server', 'php', 'extensions')
-            }
-        }
+        self._plan = _PLAN
+
+        # Persistent session so polls reuse the same TCP/TLS connection
+        # instead of handshaking from scratch every 15 seconds; shared
+        # across workers pointed at the same host
+        self.session = _get_session(urlparse(instance).netloc)
+
+        # Conditional-GET cache: replay the last parsed result on 304s
+        # so steady-state polls skip the body transfer and the parse
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._cached_parsed: Optional[Dict[str, Dict[str, Any]]] = None
+        self._cached_at: float = 0.0
+
+        # Active SSE response, kept so stop() can close it and unblock
+        # the otherwise unbounded stream read
+        self._stream_response: Optional[requests.Response] = None
+
+        # Rolling RTT window used to suggest wider polling intervals
+        # on slow links (1x / 4x / 10x multipliers, capped at MAX_INTERVAL)
+        self._rtt_history: deque = deque(maxlen=3)
+
+
+    def start(self) -> None:
+        """Entry point for the worker thread: poll once, then stream if available"""
+        self.pull_metrics()
+        if settings.NC_NOTIFY_SSE:
+            self.run_event_loop()
+
+    def run_event_loop(self) -> None:
+        """Subscribe to the server's SSE endpoint and push updates as they arrive.
+
+        Runs until the stream drops or the worker is stopped; the polling
+        path stays in place as the fallback when this returns.
+        """
+        try:
+            with self.session.get(
+                settings.NC_NOTIFY_SSE,
+                stream=True,
+                auth=(self.user, self.passw),
+                headers={"Accept": "text/event-stream"},
+                timeout=(10, None)  # connect timeout only; reads block on events
+            ) as response:
+                self._stream_response = response
+                response.raise_for_status()
+                self.stream_connected.emit()
+                for line in response.iter_lines():
+                    if not self.running:
+                        return
+                    if not line.startswith(b"data:"):
+                        continue
+                    try:
+                        payload = _parse_json(line[len(b"data:"):])
+                    except ValueError:
+                        continue
+                    self.data_ready.emit(self.select_data(payload))
+        except Exception as err:
+            if self.running:
+                self.error_occurred.emit(f"Stream Error: {err}")
+        finally:
+            self._stream_response = None
+            self.stream_closed.emit()
 
     def pull_metrics(self) -> None:
         """Pull metrics from Nextcloud instance in a thread-safe way"""
         self.update_started.emit()  # Notify UI that update has started
+
+        # Coalesce refreshes arriving faster than the cache TTL
+        if self._cached_parsed is not None and time.monotonic() - self._cached_at < MIN_TTL:
+            self.data_ready.emit(self._cached_parsed)
+            return
+
+        headers = {
+            "If-None-Match": self._etag,
+            "If-Modified-Since": self._last_modified
+        }
+        headers = {name: value for name, value in headers.items() if value}
+
         try:
-            request = requests.get(
+            t0 = time.monotonic()
+            with self.session.get(
                 self.instance,
-                headers={"OCS-APIRequest": "true"},
                 auth=(self.user, self.passw),
+                headers=headers,
+                stream=True,
                 timeout=10  # Add timeout to prevent hanging
-            ).json()
-            selected_data = self.select_data(request)
+            ) as response:
+                self._record_rtt(time.monotonic() - t0)
+                if response.status_code == 304 and self._cached_parsed is not None:
+                    # Server says nothing changed; skip the parse entirely
+                    self._cached_at = time.monotonic()
+                    self.data_ready.emit(self._cached_parsed)
+                    return
+                if ijson is not None:
+                    selected_data = self._stream_select(response)
+                else:
+                    selected_data = self.select_data(_parse_json(response.content))
+                self._etag = response.headers.get("ETag")
+                self._last_modified = response.headers.get("Last-Modified")
+            self._cached_parsed = selected_data
+            self._cached_at = time.monotonic()
+            logger.debug("selected=%r", selected_data)
             self.data_ready.emit(selected_data)
-        except requests.exceptions.JSONDecodeError:
+        except ValueError:  # covers orjson and stdlib decode errors alike
             try:
-                request = requests.get(settings.NC_ROOT, timeout=10).json()
+                fallback = self.session.get(settings.NC_ROOT, timeout=10)
+                request = _parse_json(fallback.content)
                 selected_data = self.select_data(request)
                 self.data_ready.emit(selected_data)
             except Exception as err:
@@ -78,60 +287,129 @@ class MonitorWorker(QObject):
         except Exception as err:
             self.error_occurred.emit(f"Request Error: {err}")
 
+    def _stream_select(self, response: requests.Response) -> Dict[str, Dict[str, Any]]:
+        """Stream-parse the response body, keeping only the enabled paths.
+
+        Walks the raw stream with ijson and stops reading as soon as every
+        wanted value has been seen, so the bulk of the payload is never
+        materialized as Python objects.
+        """
+        selected_data: Dict[str, Dict[str, Any]] = {
+            section: values.copy() for section, values in _RESULT_TEMPLATE.items()
+        }
+        remaining = len(self._plan)
+        response.raw.decode_content = True  # undo transport compression for ijson
+
+        # Container-valued keys (opcache, extensions) are rebuilt with an
+        # ObjectBuilder fed every event until the container closes
+        builder = None
+        builder_prefix = ""
+        builder_target = ("", "")
+
+        try:
+            # use_float keeps streamed numbers identical to the full
+            # parsers, which decode JSON floats as float, not Decimal
+            for prefix, event, value in ijson.parse(response.raw, use_float=True):
+                if builder is not None:
+                    builder.event(event, value)
+                    if prefix == builder_prefix and event in ('end_map', 'end_array'):
+                        section, key = builder_target
+                        selected_data[section][key] = builder.value
+                        builder = None
+                        remaining -= 1
+                        if not remaining:
+                            break
+                    continue
+                target = _WANTED_PREFIXES.get(prefix)
+                if target is None:
+                    continue
+                if event in ('start_map', 'start_array'):
+                    builder = ijson.ObjectBuilder()
+                    builder.event(event, value)
+                    builder_prefix = prefix
+                    builder_target = target
+                elif event != 'map_key':
+                    section, key = target
+                    selected_data[section][key] = value
+                    remaining -= 1
+                    if not remaining:
+                        break
+        except ijson.JSONError as err:
+            # Present malformed bodies the same way the full parsers do
+            raise ValueError(str(err)) from err
+        return selected_data
+
+    def abort_stream(self) -> None:
+        """Close the active event stream so its blocked read returns"""
+        response = self._stream_response
+        if response is not None:
+            response.close()
+
+    def _record_rtt(self, rtt: float) -> None:
+        """Track response time and hint a matching poll interval to the UI"""
+        self._rtt_history.append(rtt)
+        avg = sum(self._rtt_history) / len(self._rtt_history)
+        multiplier = 1 if avg < 0.5 else 4 if avg < 1.5 else 10
+        self.interval_hint.emit(min(BASE_INTERVAL * multiplier, MAX_INTERVAL))
+
     def select_data(self, request_data: dict) -> Dict[str, Dict[str, Any]]:
         """Process the request data and select relevant information"""
-        selected_data: Dict[str, Dict[str, Any]] = {}
-        
-        for section, keys in settings.enabled_settings.items():
-            selected_data[section] = {}
-            for key in keys:
-                # Get the path from our mapping
-                path = self.response_map[section][key]
-                
-                # Navigate through the response
-                value = request_data
-                try:
-                    for step in path:
-                        value = value[step]
-                    selected_data[section][key] = value
-                except (KeyError, TypeError):
-                    selected_data[section][key] = None
+        selected_data: Dict[str, Dict[str, Any]] = {
+            section: values.copy() for section, values in _RESULT_TEMPLATE.items()
+        }
+        for section, key, getter in self._plan:
+            try:
+                selected_data[section][key] = getter(request_data)
+            except (KeyError, TypeError):
+                pass  # template already carries None for missing values
         return selected_data
 
 
 class NextcloudMonitor(QObject):
     """
-    Main monitor class that manages worker threads
+    Main monitor class that runs worker tasks on a bounded thread pool
     """
     def __init__(self, instance, user, passw):
         super().__init__()
         self.instance = instance
         self.user = user
         self.passw = passw
-        
-        # Create worker and thread
+
         self.worker = MonitorWorker(instance, user, passw)
-        self.thread = QThread()
-        
-        # Move worker to thread
-        self.worker.moveToThread(self.thread)
-        
-        # Connect signals
-        self.thread.started.connect(self.worker.pull_metrics)
-        
-        # Start the thread
-        self.thread.start()
+
+        # Bounded pool keeps all network work off the UI thread; two
+        # workers leave room for the SSE stream alongside one-shot polls.
+        # Worker signals emitted from pool threads are auto-queued by Qt
+        # onto the GUI thread, so slots never run off it.
+        self._executor = ThreadPoolExecutor(max_workers=2)
+        self._lock = threading.Lock()
+        self._in_flight = False
+
+        # Initial poll (and stream subscription when configured)
+        self._executor.submit(self.worker.start)
 
     def refresh(self):
-        """Trigger a refresh of the data"""
-        if self.thread.isRunning():
-            # Use QTimer.singleShot to ensure this runs in the worker's thread
-            QTimer.singleShot(0, self.worker.pull_metrics)
+        """Trigger a refresh of the data, deduping in-flight requests"""
+        with self._lock:
+            if self._in_flight:
+                return
+            self._in_flight = True
+        future = self._executor.submit(self.worker.pull_metrics)
+        future.add_done_callback(self._poll_finished)
+
+    def _poll_finished(self, future: Future) -> None:
+        with self._lock:
+            self._in_flight = False
 
     def stop(self):
-        """Clean up threads"""
-        self.thread.quit()
-        self.thread.wait()
+        """Shut down the worker pool"""
+        self.worker.running = False
+        # Session.close only drains idle pooled connections; the active
+        # streaming response must be closed explicitly or its blocked
+        # read keeps a non-daemon pool thread alive past app exit
+        self.worker.abort_stream()
+        _close_sessions()
+        self._executor.shutdown(wait=False, cancel_futures=True)
 
 
 class StatusWindow(QMainWindow):
@@ -161,56 +439,109 @@ class StatusWindow(QMainWindow):
         container.setLayout(layout)
         self.setCentralWidget(container)
 
-        # Auto-refresh every 15 seconds
+        # Auto-refresh, widening the interval when the link is slow
+        self._interval = BASE_INTERVAL
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_status)
-        self.timer.start(15000)
+        self.timer.start(self._interval)
 
-        # Connect monitor signals
-        self.monitor.worker.data_ready.connect(self.update_status_display)
-        self.monitor.worker.error_occurred.connect(self.show_error)
+        # Connect monitor signals; worker signals are emitted from pool
+        # threads, so pin the connections as queued once instead of
+        # letting Qt re-resolve the connection type on every emit
+        self._streaming = False
+        self._last_sig: Optional[int] = None  # signature of the last rendered payload
+        queued = Qt.ConnectionType.QueuedConnection
+        self.monitor.worker.data_ready.connect(self.update_status_display, queued)
+        self.monitor.worker.error_occurred.connect(self.show_error, queued)
+        self.monitor.worker.stream_connected.connect(self.on_stream_connected, queued)
+        self.monitor.worker.stream_closed.connect(self.on_stream_closed, queued)
+        self.monitor.worker.interval_hint.connect(self.on_interval_hint, queued)
+
+    def on_interval_hint(self, interval: int) -> None:
+        """Adopt the worker's suggested poll interval for the next cycle"""
+        if interval != self._interval:
+            self._interval = interval
+            if not self._streaming:
+                self.timer.start(interval)
+
+    def on_stream_connected(self) -> None:
+        """Push updates are live; the polling timer is redundant"""
+        self._streaming = True
+        self.timer.stop()
+        self.statusBar().showMessage("Live updates connected")
+
+    def on_stream_closed(self) -> None:
+        """Stream dropped; fall back to the 15 s polling timer"""
+        if self._streaming:
+            self._streaming = False
+            self.timer.start(self._interval)
 
     def show_loading(self):
         """Show loading state while data is being fetched"""
         self.statusBar().showMessage("Fetching data...")
         self.refresh_button.setEnabled(False)  # Disable button during refresh
 
-    def format_status_data(self, status_data: Union[Dict[str, Any], List[Any], str], indent: int = 0) -> str:
-        """Recursively format status data into a readable string."""
+    def format_status_data(self, status_data: Union[Dict[str, Any], List[Any], str]) -> str:
+        """Format status data into a readable string with one iterative walk.
+
+        Uses an explicit stack and a single shared line list so the whole
+        tree is joined exactly once, with no recursion and no per-level
+        intermediate strings. Entries pushed with indent -1 are already
+        formatted lines.
+        """
         lines: List[str] = []
-        indent_str = " " * indent
-        
-        if isinstance(status_data, dict):
-            for key, value in status_data.items():
-                if isinstance(value, (dict, list)):
-                    lines.append(f"{indent_str}{key}:")
-                    lines.append(self.format_status_data(value, indent + 2))
-                else:
-                    lines.append(f"{indent_str}{key}: {value}")
-        elif isinstance(status_data, list):
-            for i, item in enumerate(status_data):
-                lines.append(f"{indent_str}[{i}]:")
-                lines.append(self.format_status_data(item, indent + 2))
-        else:
-            lines.append(f"{indent_str}{status_data}")
-        
+        indent_cache: Dict[int, str] = {0: ""}
+        stack: List[Tuple[Any, int]] = [(status_data, 0)]
+
+        while stack:
+            node, indent = stack.pop()
+            if indent < 0:
+                lines.append(node)
+                continue
+            indent_str = indent_cache.get(indent)
+            if indent_str is None:
+                indent_str = indent_cache.setdefault(indent, " " * indent)
+            if isinstance(node, dict):
+                # Push in reverse so items pop in declaration order
+                for key, value in reversed(node.items()):
+                    if isinstance(value, (dict, list)):
+                        stack.append((value, indent + 2))
+                        stack.append((f"{indent_str}{key}:", -1))
+                    else:
+                        stack.append((f"{indent_str}{key}: {value}", -1))
+            elif isinstance(node, list):
+                for i in range(len(node) - 1, -1, -1):
+                    stack.append((node[i], indent + 2))
+                    stack.append((f"{indent_str}[{i}]:", -1))
+            else:
+                lines.append(f"{indent_str}{node}")
+
         return "\n".join(lines)
     
     def update_status(self) -> None:
         """Trigger a status update in the monitor thread"""
         self.show_loading()
-        self.timer.stop()
-        self.timer.start(15000)
+        if not self._streaming:
+            self.timer.stop()
+            self.timer.start(self._interval)
         self.monitor.refresh()
 
     def update_status_display(self, status: dict) -> None:
         """Update the GUI with the latest status (called from worker thread)"""
         if "error" in status:
             self.status_label.setText(f"Error: {status['error']}")
+            self._last_sig = None
         else:
+            sig = _data_signature(status)
+            if sig == self._last_sig:
+                # Identical payload; skip the reformat and the Qt relayout
+                self.statusBar().showMessage("Refreshed")
+                self.refresh_button.setEnabled(True)
+                return
+            self._last_sig = sig
             formatted_status = self.format_status_data(status)
             self.status_label.setText(formatted_status)
-        
+
         self.statusBar().showMessage("")
         self.refresh_button.setEnabled(True)  # Re-enable button after refresh
 
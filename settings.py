@@ -1,32 +1,37 @@
 import os
 import configparser
+import functools
+import logging
 from os.path import join, dirname
 from dotenv import load_dotenv
 
+logger = logging.getLogger(__name__)
+
 # define paths
 dotenv_path = join(dirname(__file__), '.env')
 conf_path = join(dirname(__file__), 'nextracker.conf')
 
+@functools.lru_cache(maxsize=1)
+def _load_enabled() -> dict[str,list[str]]:
+    """Parse nextracker.conf once and cache the enabled sections/keys"""
+    config = configparser.ConfigParser()
+    with open(conf_path) as conf_file:
+        config.read_string(conf_file.read())
+
+    enabled :dict[str,list[str]] = {}
+    for section in config.sections():
+        try:
+            # section proxy avoids re-running interpolation per key
+            proxy = config[section]
+            enabled[section] = [key for key in proxy if proxy.getboolean(key)]
+        except (ValueError, configparser.Error) as e:
+            logger.warning("Error processing section '%s': %s", section, e)
+            continue
+
+    return {section: keys for section, keys in enabled.items() if keys}
+
 # select only enabled settings
-config = configparser.ConfigParser()
-config.read(conf_path)
-
-enabled_settings :dict[str,list[str]] = {}
-
-for section in config.sections():
-    try:
-        enabled_settings[section] = [
-            key for key in config[section] 
-            if config.getboolean(section, key)
-        ]
-    except (ValueError, configparser.Error) as e:
-        print(f"Warning: Error processing section '{section}': {str(e)}")
-        continue
-
-enabled_settings = {
-    section: keys for section, keys in enabled_settings.items() 
-    if keys
-}
+enabled_settings :dict[str,list[str]] = _load_enabled()
 
 # dotenv shenanigans
 load_dotenv(dotenv_path)
@@ -34,6 +39,8 @@ NC_INSTANCE :str = str(os.environ.get("NC_INSTANCE"))
 NC_ROOT :str = str(os.environ.get("NC_ROOT"))
 NC_PASS :str = str(os.environ.get("NC_PASS"))
 NC_USER :str = str(os.environ.get("NC_USER"))
+# optional SSE endpoint for push updates; empty disables streaming
+NC_NOTIFY_SSE :str = os.environ.get("NC_NOTIFY_SSE", "")
 
 def update_settings(settings):
     pass